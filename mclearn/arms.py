@@ -20,6 +20,7 @@ import numpy as np
 from abc import ABC, abstractmethod
 from numpy.random import RandomState
 from scipy.stats import itemfreq
+from sklearn.utils.random import sample_without_replacement
 
 __all__ = ['RandomArm',
            'MarginArm',
@@ -59,10 +60,25 @@ class Arm(ABC):
             self.seed = RandomState(random_state)
 
     @abstractmethod
-    def select(self, candidate_mask, predictions, n_best_candidates):
+    def select(self, candidate_mask, predictions, n_best_candidates, candidate_pool=None):
         """ Needs to return an array of indices of objects from the pool. """
         pass
 
+    def _select_randomly(self, candidate_mask, n_best_candidates):
+        """ Pick random candidates. """
+        candidate_indices = np.flatnonzero(candidate_mask)
+
+        # if every candidate is returned, the order is the only random part, which
+        # (unlike choice) takes only one shuffle of the candidates
+        if n_best_candidates >= len(candidate_indices):
+            return self.seed.permutation(candidate_indices)
+
+        # sample_without_replacement picks a permutation, reservoir sampling or
+        # tracking selection depending on how many of the candidates are needed
+        random_candidates = candidate_indices[sample_without_replacement(
+            len(candidate_indices), n_best_candidates, random_state=self.seed)]
+        return random_candidates
+
     def _select_from_scores(self, candidate_mask, candidate_scores, n_best_candidates):
         """ Pick the candidates with the highest scores. """
         pool_scores = np.full(len(candidate_mask), -np.inf)
@@ -90,7 +106,7 @@ class RandomArm(Arm):
         random_state : int or RandomState object, optional (default=None)
             Provide a random seed if the results need to be reproducible.
     """
-    def select(self, candidate_mask, predictions, n_best_candidates=1):
+    def select(self, candidate_mask, predictions, n_best_candidates=1, candidate_pool=None):
         """ Pick random candidates from the unlabelled pool.
 
             Parameters
@@ -104,14 +120,16 @@ class RandomArm(Arm):
             n_best_candidates : int, optional (default=1)
                 The number of best candidates to be returned.
 
+            candidate_pool : numpy array, optional (default=None)
+                The feature matrix of the candidates, i.e. pool[candidate_mask]. If not
+                given, arms that need the features will gather them from the pool.
+
             Returns
             -------
             best_candidates : int
                 The indices of the best candidates.
         """
-        candidate_indices = np.where(candidate_mask)[0]
-        n_best_candidates = min(n_best_candidates, len(candidate_indices))
-        random_candidates = self.seed.choice(candidate_indices, n_best_candidates, replace=False)
+        random_candidates = self._select_randomly(candidate_mask, n_best_candidates)
         return random_candidates
 
 
@@ -174,7 +192,7 @@ class MarginArm(WeightedArm):
             A similarity matrix of all the examples in the pool. If not given,
             The information density will not be used.
     """
-    def select(self, candidate_mask, predictions, n_best_candidates=1):
+    def select(self, candidate_mask, predictions, n_best_candidates=1, candidate_pool=None):
         """ Pick the candidates with the smallest margin.
 
             Parameters
@@ -188,6 +206,10 @@ class MarginArm(WeightedArm):
             n_best_candidates : int, optional (default=1)
                 The number of best candidates to be returned.
 
+            candidate_pool : numpy array, optional (default=None)
+                The feature matrix of the candidates, i.e. pool[candidate_mask]. If not
+                given, arms that need the features will gather them from the pool.
+
             Returns
             -------
             best_candidates : int
@@ -223,7 +245,7 @@ class ConfidenceArm(WeightedArm):
             A similarity matrix of all the examples in the pool. If not given,
             The information density will not be used.
     """
-    def select(self, candidate_mask, predictions, n_best_candidates=1):
+    def select(self, candidate_mask, predictions, n_best_candidates=1, candidate_pool=None):
         """ Pick the candidates with the smallest probability of the most likely label.
 
             Parameters
@@ -237,6 +259,10 @@ class ConfidenceArm(WeightedArm):
             n_best_candidates : int, optional (default=1)
                 The number of best candidates to be returned.
 
+            candidate_pool : numpy array, optional (default=None)
+                The feature matrix of the candidates, i.e. pool[candidate_mask]. If not
+                given, arms that need the features will gather them from the pool.
+
             Returns
             -------
             best_candidates : int
@@ -267,7 +293,7 @@ class EntropyArm(WeightedArm):
             A similarity matrix of all the examples in the pool. If not given,
             The information density will not be used.
     """
-    def select(self, candidate_mask, predictions, n_best_candidates=1):
+    def select(self, candidate_mask, predictions, n_best_candidates=1, candidate_pool=None):
         """ Pick the candidates whose prediction vectors display the greatest entropy.
 
             Parameters
@@ -281,6 +307,10 @@ class EntropyArm(WeightedArm):
             n_best_candidates : int, optional (default=1)
                 The number of best candidates to be returned.
 
+            candidate_pool : numpy array, optional (default=None)
+                The feature matrix of the candidates, i.e. pool[candidate_mask]. If not
+                given, arms that need the features will gather them from the pool.
+
             Returns
             -------
             best_candidates : int
@@ -328,6 +358,73 @@ class CommitteeArm(WeightedArm):
         self.committee = committee
         self.n_committee_samples=n_committee_samples
 
+    def fit_and_predict(self, candidate_mask, candidate_pool=None):
+        """ Train the committee and generate prediction vectors for the candidates.
+
+            Parameters
+            ----------
+            candidate_mask : numpy boolean array
+                The boolean array that tells us which examples the arm is allowed to examine.
+
+            candidate_pool : numpy array, optional (default=None)
+                The feature matrix of the candidates, i.e. pool[candidate_mask]. If not
+                given, the features are gathered from the pool.
+
+            Returns
+            -------
+            committee_predictions : tuple or None
+                The average class probabilities of the candidates and the list of class
+                probabilities from each committee member. None if the committee cannot
+                be trained.
+        """
+        n_labelled = self.labels.count()
+
+        # check that the max bagging sample is not too big
+        self.committee.max_samples = min(self.n_committee_samples, n_labelled)
+
+        # train the committee
+        try:
+            self.committee.fit(self.pool[~self.labels.mask], self.labels[~self.labels.mask])
+        # the classifier will fail if there is only one class in the training set
+        except ValueError:
+            logger.info('Iteration {}: Class distribution is too skewed.'.format(n_labelled) +
+                        'Falling back to passive learning.')
+            return None
+
+        return self._predict(candidate_mask, candidate_pool)
+
+    def _predict(self, candidate_mask, candidate_pool=None):
+        """ Generate prediction vectors for the unlabelled candidates. """
+        candidates = self.pool[candidate_mask] if candidate_pool is None else candidate_pool
+        n_samples = len(candidates)
+        n_classes = len(self.committee.classes_)
+        avg_probs = np.zeros((n_samples, n_classes))
+        prob_list = []
+
+        # classes ordered from the most to the least frequent in the training set
+        class_freq = itemfreq(self.labels[~self.labels.mask])
+        frequent_classes = class_freq[:,1].argsort()[::-1]
+
+        for member in self.committee.estimators_:
+            member_prob = member.predict_proba(candidates)
+            member_n_classes = member_prob.shape[1]
+
+            if n_classes == member_n_classes:
+                avg_probs += member_prob
+                prob_list.append(member_prob)
+
+            else:
+                member_classes = frequent_classes[:member_n_classes]
+                full_member_prob = np.zeros((n_samples, n_classes))
+                full_member_prob[:, member_classes] += member_prob[:, range(member_n_classes)]
+                avg_probs += full_member_prob
+                prob_list.append(full_member_prob)
+
+        # average out the probabilities
+        avg_probs /= len(self.committee.estimators_)
+
+        return (avg_probs, prob_list)
+
 
 class QBBMarginArm(CommitteeArm):
     """ Pick the candidates with the smallest average margins.
@@ -357,7 +454,8 @@ class QBBMarginArm(CommitteeArm):
             A similarity matrix of all the examples in the pool. If not given,
             The information density will not be used.
     """
-    def select(self, candidate_mask, predictions, n_best_candidates=1):
+    def select(self, candidate_mask, predictions, n_best_candidates=1, candidate_pool=None,
+               committee_predictions=None):
         """ Pick the candidates with the smallest average margins.
 
             Parameters
@@ -371,28 +469,25 @@ class QBBMarginArm(CommitteeArm):
             n_best_candidates : int, optional (default=1)
                 The number of best candidates to be returned.
 
+            candidate_pool : numpy array, optional (default=None)
+                The feature matrix of the candidates, i.e. pool[candidate_mask]. If not
+                given, arms that need the features will gather them from the pool.
+
+            committee_predictions : tuple, optional (default=None)
+                The output of fit_and_predict on the same candidates. A policy can pass it
+                in when several arms share the same committee, so that the committee is
+                only trained once per round. If not given, the committee is trained here.
+
             Returns
             -------
             best_candidates : int
                 The indices of the best candidates.
         """
-        # check that the max bagging sample is not too big
-        self.committee.max_samples = min(self.n_committee_samples, np.sum(~self.labels.mask))
-
-        # train the committee
-        try:
-            self.committee.fit(self.pool[~self.labels.mask], self.labels[~self.labels.mask])
-        # the classifier will fail if there is only one class in the training set
-        except ValueError:
-            logger.info('Iteration {}: Class distribution is too skewed.'.format(
-                         np.sum(~self.labels.mask)) +
-                        'Falling back to passive learning.')
-            candidate_indices = np.where(candidate_mask)[0]
-            n_best_candidates = min(n_best_candidates, len(candidate_indices))
-            random_candidates = self.seed.choice(candidate_indices, n_best_candidates, replace=False)
-            return random_candidates
-
-        committee_predictions = self._predict(candidate_mask)
+        if committee_predictions is None:
+            committee_predictions = self.fit_and_predict(candidate_mask, candidate_pool)
+        if committee_predictions is None:
+            return self._select_randomly(candidate_mask, n_best_candidates)
+        committee_predictions = committee_predictions[0]
 
         # sort the probabilities from smallest to largest
         committee_predictions = np.sort(committee_predictions, axis=1)
@@ -405,30 +500,6 @@ class QBBMarginArm(CommitteeArm):
         best_candidates = self._select_from_scores(candidate_mask, margin, n_best_candidates)
         return best_candidates
 
-    def _predict(self, candidate_mask):
-        """ Generate prediction vectors for the unlabelled candidates. """
-        n_samples = len(self.pool[candidate_mask])
-        n_classes = len(self.committee.classes_)
-        probs = np.zeros((n_samples, n_classes))
-        class_freq = itemfreq(self.labels[~self.labels.mask])
-
-        for member in self.committee.estimators_:
-            member_prob = member.predict_proba(self.pool[candidate_mask])
-            member_n_classes = member_prob.shape[1]
-
-            if n_classes == member_n_classes:
-                probs += member_prob
-
-            else:
-                member_classes = class_freq[:,1].argsort()[::-1]
-                member_classes = member_classes[:member_n_classes]
-                probs[:, member_classes] += member_prob[:, range(member_n_classes)]
-
-        # average out the probabilities
-        probs /= len(self.committee.estimators_)
-
-        return probs
-
 
 class QBBKLArm(CommitteeArm):
     """ Pick the candidates with the largest average KL divergence from the mean.
@@ -458,7 +529,8 @@ class QBBKLArm(CommitteeArm):
             A similarity matrix of all the examples in the pool. If not given,
             The information density will not be used.
     """
-    def select(self, candidate_mask, predictions, n_best_candidates=1):
+    def select(self, candidate_mask, predictions, n_best_candidates=1, candidate_pool=None,
+               committee_predictions=None):
         """ Pick the candidates with the largest average KL divergence from the mean.
 
             Parameters
@@ -472,28 +544,25 @@ class QBBKLArm(CommitteeArm):
             n_best_candidates : int, optional (default=1)
                 The number of best candidates to be returned.
 
+            candidate_pool : numpy array, optional (default=None)
+                The feature matrix of the candidates, i.e. pool[candidate_mask]. If not
+                given, arms that need the features will gather them from the pool.
+
+            committee_predictions : tuple, optional (default=None)
+                The output of fit_and_predict on the same candidates. A policy can pass it
+                in when several arms share the same committee, so that the committee is
+                only trained once per round. If not given, the committee is trained here.
+
             Returns
             -------
             best_candidates : int
                 The indices of the best candidates.
         """
-        # check that the max bagging sample is not too big
-        self.committee.max_samples = min(self.n_committee_samples, np.sum(~self.labels.mask))
-
-        # train the committee
-        try:
-            self.committee.fit(self.pool[~self.labels.mask], self.labels[~self.labels.mask])
-        # the classifier will fail if there is only one class in the training set
-        except ValueError:
-            logger.info('Iteration {}: Class distribution is too skewed.'.format(
-                         np.sum(~self.labels.mask)) +
-                        'Falling back to passive learning.')
-            candidate_indices = np.where(candidate_mask)[0]
-            n_best_candidates = min(n_best_candidates, len(candidate_indices))
-            random_candidates = self.seed.choice(candidate_indices, n_best_candidates, replace=False)
-            return random_candidates
-
-        avg_probs, prob_list = self._predict(candidate_mask)
+        if committee_predictions is None:
+            committee_predictions = self.fit_and_predict(candidate_mask, candidate_pool)
+        if committee_predictions is None:
+            return self._select_randomly(candidate_mask, n_best_candidates)
+        avg_probs, prob_list = committee_predictions
 
         # compute the KL divergence
         avg_kl = np.zeros(avg_probs.shape[0])
@@ -508,32 +577,3 @@ class QBBKLArm(CommitteeArm):
 
         best_candidates = self._select_from_scores(candidate_mask, avg_kl, n_best_candidates)
         return best_candidates
-
-    def _predict(self, candidate_mask):
-        """ Generate prediction vectors for the unlabelled candidates. """
-        n_samples = len(self.pool[candidate_mask])
-        n_classes = len(self.committee.classes_)
-        avg_probs = np.zeros((n_samples, n_classes))
-        prob_list = []
-        class_freq = itemfreq(self.labels[~self.labels.mask])
-
-        for member in self.committee.estimators_:
-            member_prob = member.predict_proba(self.pool[candidate_mask])
-            member_n_classes = member_prob.shape[1]
-
-            if n_classes == member_n_classes:
-                avg_probs += member_prob
-                prob_list.append(member_prob)
-
-            else:
-                member_classes = class_freq[:,1].argsort()[::-1]
-                member_classes = member_classes[:member_n_classes]
-                full_member_prob = np.zeros((n_samples, n_classes))
-                full_member_prob[:, member_classes] += member_prob[:, range(member_n_classes)]
-                avg_probs += full_member_prob
-                prob_list.append(full_member_prob)
-
-        # average out the probabilities
-        avg_probs /= len(self.committee.estimators_)
-
-        return (avg_probs, prob_list)
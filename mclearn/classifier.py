@@ -222,11 +222,14 @@ def learning_curve(classifier, X, y, cv, sample_sizes,
     """ Learning curve
     """
 
+    # the classifier never sees more than the largest sample of the training set
+    max_sample = max(sample_sizes)
+
     learning_curves = []
     for i, (train_index, test_index) in enumerate(cv):
-        X_train = X[train_index]
+        X_train = X[train_index[:max_sample]]
         X_test = X[test_index]
-        y_train = y[train_index]
+        y_train = y[train_index[:max_sample]]
         y_test = y[test_index]
 
         if degree > 1:
@@ -245,13 +248,19 @@ def learning_curve(classifier, X, y, cv, sample_sizes,
 
         learning_curves.append(lc)
         if verbose: print(i, end=' ')
-    
+
+    # store the curves as one array of shape [n_folds, n_sample_sizes], which is pickled
+    # as a single buffer instead of one object per score
+    learning_curves = np.asarray(learning_curves)
+
     # pickle learning curve
     if pickle_path:
         with open(pickle_path, 'wb') as f:
             pickle.dump(learning_curves, f, protocol=4)
     if verbose: print()
 
+    return learning_curves
+
 
 
 def learning_curve_old(data, feature_cols, target_col, classifier, train_sizes, test_sizes=200000,
@@ -793,6 +802,9 @@ def predict_unlabelled_objects(file_path, table, classifier,
     star_map = np.zeros((3600, 3600), dtype=int)
     object_maps = [galaxy_map, quasar_map, star_map]
 
+    # the line number at which the next progress report is printed
+    next_report = 0
+
     for i, chunk in enumerate(sdss_chunks):
         # apply reddening correction and compute key colours
         optimise_sdss_features(chunk, scaler_path)
@@ -812,8 +824,9 @@ def predict_unlabelled_objects(file_path, table, classifier,
                 print('Invalid prediction.')
         
         current_line = i * chunksize
-        if verbose and current_line % 1000000 == 0:
+        if verbose and current_line >= next_report:
             print(current_line // 1000000, end=' ')
+            next_report += 1000000
 
     if verbose: print()
 
@@ -4,7 +4,10 @@
 # License: BSD 3 clause
 
 import os
+import shutil
 import numpy as np
+from contextlib import contextmanager
+from tempfile import mkdtemp
 from time import time
 from joblib import Parallel, delayed
 from numpy.random import RandomState
@@ -14,11 +17,10 @@ from sklearn.ensemble import BaggingClassifier
 from sklearn.externals import joblib
 from sklearn.kernel_approximation import RBFSampler
 from sklearn.metrics.pairwise import pairwise_distances, rbf_kernel
-from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import StandardScaler
 
 from mclearn.arms import RandomArm, MarginArm, ConfidenceArm, EntropyArm, QBBMarginArm, QBBKLArm
-from mclearn.performance import mpba_score, micro_f1_score
+from mclearn.performance import classification_scores
 from mclearn.policies import SingleSuggestion, ThompsonSampling, OCUCB, KLUCB, EXP3PP, ActiveAggregator
 
 
@@ -44,8 +46,17 @@ class ActiveExperiment:
     """ Simulate an active learning experiment. """
     def __init__(self, X, y, dataset, policy_name, scale=True, n_iter=10, passive=True):
         seed = RandomState(1234)
-        self.X = np.asarray(X, dtype=np.float64)
-        self.y = np.asarray(y)
+        self.X = np.asarray(X)
+
+        # keep the precision of floating point features instead of promoting them all to
+        # float64, which would double the memory used by float32 data
+        if not np.issubdtype(self.X.dtype, np.floating):
+            self.X = self.X.astype(np.float64)
+
+        # encode the labels as small integers, which are much cheaper to compare and
+        # store than strings. The original labels can be recovered from self.classes
+        self.classes, y = np.unique(np.asarray(y), return_inverse=True)
+        self.y = y.astype(np.min_scalar_type(len(self.classes)))
         self.X = StandardScaler().fit_transform(self.X) if scale else self.X
         self.policy_name = policy_name
         self.dataset = dataset
@@ -66,8 +77,9 @@ class ActiveExperiment:
 
     def run_policies(self):
         start_time = time()
-        outputs = Parallel(n_jobs=-1)(delayed(self._run_fold)(train_index, test_index)
-                                      for train_index, test_index in self.kfold)
+        with self._shared_arrays('X', 'X_transformed', 'y'):
+            outputs = Parallel(n_jobs=-1)(delayed(self._run_fold)(train_index, test_index)
+                                          for train_index, test_index in self.kfold)
         end_time = time()
 
         # unpack results
@@ -80,31 +92,57 @@ class ActiveExperiment:
         save_results(self.dataset, save_name, results)
 
     def run_asymptote(self):
-        results = {
-            'asymptote_mpba': [],
-            'asymptote_accuracy': [],
-            'asymptote_f1': []}
-
-        for train_index, test_index in self.kfold:
-            X_train = self.X_transformed[train_index]
-            X_test = self.X_transformed[test_index]
-            y_train = self.y[train_index]
-            y_test = self.y[test_index]
-            n_classes = len(np.unique(y_test))
-            seed = RandomState(1234)
-            classifier = LogisticRegression(multi_class='ovr', penalty='l2', C=1000,
-                                            random_state=seed, class_weight='balanced')
-            classifier.fit(X_train, y_train)
-            y_pred = classifier.predict(X_test)
-            results['asymptote_mpba'].append(mpba_score(y_test, y_pred))
-            results['asymptote_accuracy'].append(accuracy_score(y_test, y_pred))
-            results['asymptote_f1'].append(micro_f1_score(y_test, y_pred, n_classes))
+        with self._shared_arrays('X_transformed', 'y'):
+            outputs = Parallel(n_jobs=-1)(delayed(self._run_asymptote_fold)(train_index, test_index)
+                                          for train_index, test_index in self.kfold)
 
-        for key in results:
-            results[key] = np.array(results[key])
+        # unpack results
+        results = {}
+        for key in outputs[0]:
+            results[key] = np.array([fold[key] for fold in outputs])
 
         save_results(self.dataset, 'asymptote', results)
 
+    def _run_asymptote_fold(self, train_index, test_index):
+        X_train = self.X_transformed[train_index]
+        X_test = self.X_transformed[test_index]
+        y_train = self.y[train_index]
+        y_test = self.y[test_index]
+        n_classes = len(np.unique(y_test))
+        seed = RandomState(1234)
+        classifier = LogisticRegression(multi_class='ovr', penalty='l2', C=1000,
+                                        random_state=seed, class_weight='balanced')
+        classifier.fit(X_train, y_train)
+        y_pred = classifier.predict(X_test)
+        mpba, accuracy, f1 = classification_scores(y_test, y_pred, n_classes)
+
+        return {
+            'asymptote_mpba': mpba,
+            'asymptote_accuracy': accuracy,
+            'asymptote_f1': f1}
+
+    @contextmanager
+    def _shared_arrays(self, *names):
+        """ Temporarily back the named data attributes by read-only memory-mapped files.
+
+            Each worker receives a pickled copy of the experiment. With the data
+            memory-mapped, only the file names are sent and all workers share the
+            same pages, so memory usage does not grow with the number of workers.
+            Only the arrays that the workers actually read need to be dumped.
+        """
+        arrays = {name: getattr(self, name) for name in names}
+        temp_folder = mkdtemp(prefix='mclearn_')
+        try:
+            for name in names:
+                path = os.path.join(temp_folder, name + '.mmap')
+                joblib.dump(arrays[name], path)
+                setattr(self, name, joblib.load(path, mmap_mode='r'))
+            yield
+        finally:
+            for name in names:
+                setattr(self, name, arrays[name])
+            shutil.rmtree(temp_folder, ignore_errors=True)
+
     def _run_fold(self, train_index, test_index):
         # reset the seed
         seed = RandomState(1234)
@@ -112,7 +150,7 @@ class ActiveExperiment:
         # split data into train and test sets
         pool = self.X_transformed[train_index]
         oracle = self.y[train_index]
-        labels = np.ma.MaskedArray(oracle, mask=True, copy=True)
+        labels = np.ma.MaskedArray(oracle, mask=True)
         X_test = self.X_transformed[test_index]
         y_test = self.y[test_index]
         n_classes = len(np.unique(y_test))
@@ -133,30 +171,30 @@ class ActiveExperiment:
                                   committee, seed, similarity, horizon)
 
         # select 50 initial random examples for labelling
-        sample_idx = seed.choice(np.arange(len(pool)), initial_n, replace=False)
+        sample_idx = seed.choice(len(pool), initial_n, replace=False)
         policy.add(sample_idx, oracle[sample_idx])
         y_pred = classifier.predict(X_test)
-        mpba.append(mpba_score(y_test, y_pred))
-        accuracy.append(accuracy_score(y_test, y_pred))
-        f1.append(micro_f1_score(y_test, y_pred, n_classes))
+        mpba_i, accuracy_i, f1_i = classification_scores(y_test, y_pred, n_classes)
+        mpba.append(mpba_i)
+        accuracy.append(accuracy_i)
+        f1.append(f1_i)
 
         # start running the policy
-        while np.sum(~labels.mask) < training_size:
+        while policy.n_labelled < training_size:
             # use the policy to select the next instance for labelling
             best_candidates = policy.select()
 
             # query the oracle and add label
             policy.add(best_candidates, oracle[best_candidates])
 
-            # observe the reward
+            # observe the reward, and also compute accuracy and f1 score
             y_pred = classifier.predict(X_test)
-            mpba.append(mpba_score(y_test, y_pred))
+            mpba_i, accuracy_i, f1_i = classification_scores(y_test, y_pred, n_classes)
+            mpba.append(mpba_i)
+            accuracy.append(accuracy_i)
+            f1.append(f1_i)
             reward = mpba[-1] - mpba[-2]
 
-            # also compute accuracy and f1 score
-            accuracy.append(accuracy_score(y_test, y_pred))
-            f1.append(micro_f1_score(y_test, y_pred, n_classes))
-
             # normalise the reward to [0, 1]
             reward = (reward + 1) / 2
             policy.receive_reward(reward)
@@ -389,3 +389,51 @@ def micro_f1_score(y_true, y_pred, n_classes=None):
 
 
     return metrics.f1_score(y_true, y_pred, average=average)
+
+
+def classification_scores(y_true, y_pred, n_classes=None):
+    """ Compute the MPBA, accuracy and F1 scores of a classifier from one confusion matrix.
+
+        This is equivalent to calling mpba_score, accuracy_score and micro_f1_score
+        separately, but the predictions are only tallied once.
+
+        Parameters
+        ----------
+        y_true : array
+            Ground truth (correct) labels.
+
+        y_pred : array
+            Predicted labels, as returned by a classifier.
+
+        n_classes : int, optional (default=None)
+            The number of classes in the problem. If not given, it is inferred from y_true.
+
+        Returns
+        -------
+        mpba : float
+            The expected balanced accuracy rate on the test set.
+
+        accuracy : float
+            The accuracy rate on the test set.
+
+        f1_score : float
+            The F1 score on the test set.
+    """
+
+    # like metrics.confusion_matrix, only use the labels that appear in y_true or y_pred
+    labels, label_indices = np.unique(np.concatenate((y_true, y_pred)), return_inverse=True)
+    n_labels = len(labels)
+    true_indices = label_indices[:len(y_true)]
+    pred_indices = label_indices[len(y_true):]
+    confusion = np.bincount(n_labels * true_indices + pred_indices, minlength=n_labels ** 2)
+    confusion = confusion.reshape(n_labels, n_labels)
+
+    mpba = balanced_accuracy_expected(confusion)
+    accuracy = np.trace(confusion) / len(y_true)
+
+    # the micro-averaged F1 score of a multiclass problem is the accuracy rate
+    if n_classes is None:
+        n_classes = len(np.unique(y_true))
+    f1_score = micro_f1_score(y_true, y_pred, n_classes) if n_classes == 2 else accuracy
+
+    return mpba, accuracy, f1_score
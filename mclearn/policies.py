@@ -20,7 +20,9 @@
 import numpy as np
 from abc import ABC, abstractmethod
 from numpy.random import RandomState
+from sklearn.utils.random import sample_without_replacement
 
+from mclearn.arms import CommitteeArm
 from mclearn.schulze import _aggregate_votes_schulze
 
 __all__ = ['SingleSuggestion',
@@ -41,14 +43,17 @@ class Policy(ABC):
         Parameters
         ----------
         pool : numpy array of shape [n_samples, n_features]
-            The feature matrix of all the examples (labelled and unlabelled).
+            The feature matrix of all the examples (labelled and unlabelled). The pool
+            is only read and never modified, so there is no need to pass in a copy.
 
         labels : numpy masked array of shape [n_samples].
             The missing entries of y corresponds to the unlabelled examples.
 
         classifier : Classifier object
             The classifier should have the same interface as scikit-learn classifier.
-            In particular, it needs to have the fit and predict methods.
+            In particular, it needs to have the fit and predict methods. If it also has
+            the partial_fit method and classes is given, it is updated with the newly
+            labelled examples only instead of being retrained from scratch.
 
         random_state : int or RandomState object, optional (default=None)
             Provide a random seed if the results need to be reproducible.
@@ -63,16 +68,38 @@ class Policy(ABC):
         n_best_candidates : int, optional (default=1)
             The number of candidates returned at each iteration for labelling. Batch-mode
             active learning is where this parameter is greater than 1.
+
+        classes : array, optional (default=None)
+            All the classes that the labels can take. If given and the classifier has
+            the partial_fit method, the classifier is updated incrementally, since the
+            classes then don't need to be inferred from the labelled examples alone.
+            Otherwise the classifier is retrained from scratch with the fit method.
     """
     def __init__(self, pool, labels, classifier, random_state=None,
-                 n_candidates=None, n_best_candidates=1):
+                 n_candidates=None, n_best_candidates=1, classes=None):
         self.pool = pool
         self.labels = labels
         self.classifier = classifier
         self.n_candidates = n_candidates if n_candidates is not None else len(self.pool)
         self.n_best_candidates = n_best_candidates
+        self.classes = classes
         self.pool_size = len(self.pool)
 
+        # the labelled examples are copied into a training buffer as they arrive,
+        # so that we don't need to gather them from the whole pool at each iteration
+        self.n_labelled = 0
+        self._X_train = np.empty((0,) + self.pool.shape[1:], dtype=self.pool.dtype)
+        self._y_train = np.empty(0, dtype=self.labels.dtype)
+        self._candidate_pool = np.empty((0,) + self.pool.shape[1:], dtype=self.pool.dtype)
+        self._n_trained = 0
+
+        # the examples that were already labelled before the policy was created
+        labelled_index = np.flatnonzero(~np.ma.getmaskarray(self.labels))
+        self._reserve(len(labelled_index))
+        self.n_labelled = len(labelled_index)
+        self._X_train[:self.n_labelled] = self.pool[labelled_index]
+        self._y_train[:self.n_labelled] = self.labels.data[labelled_index]
+
         if type(random_state) is RandomState:
             self.seed = random_state
         else:
@@ -92,11 +119,38 @@ class Policy(ABC):
                 The index or indices of the object(s) that have just been labelled.
 
             label : object or array of objects
-                The label(s) obtained from the oracle.
+                The label(s) obtained from the oracle. Objects that already have a label
+                are ignored.
         """
+        index = np.atleast_1d(index)
+        label = np.broadcast_to(label, index.shape)
+
+        # skip the examples that are already in the training buffer
+        _, first = np.unique(index, return_index=True)
+        is_new = np.zeros(len(index), dtype=bool)
+        is_new[first] = True
+        is_new &= np.ma.getmaskarray(self.labels)[index]
+        index, label = index[is_new], label[is_new]
+        if len(index) == 0:
+            return
+
         self.labels[index] = label
-        train_idx = ~self.labels.mask
-        self.classifier.fit(self.pool[train_idx], self.labels[train_idx])
+
+        start = self.n_labelled
+        self._reserve(start + len(index))
+        self.n_labelled += len(index)
+        self._X_train[start:self.n_labelled] = self.pool[index]
+        self._y_train[start:self.n_labelled] = label
+
+        if self.classes is not None and hasattr(self.classifier, 'partial_fit'):
+            # incremental classifiers only need to see the examples they haven't seen yet
+            self.classifier.partial_fit(self._X_train[self._n_trained:self.n_labelled],
+                                        self._y_train[self._n_trained:self.n_labelled],
+                                        classes=self.classes)
+            self._n_trained = self.n_labelled
+        else:
+            self.classifier.fit(self._X_train[:self.n_labelled],
+                                self._y_train[:self.n_labelled])
 
     def receive_reward(self, reward):
         """ Receive a reward from the environment and update the policy's parameters. """
@@ -106,12 +160,51 @@ class Policy(ABC):
         """ Return a dictionary containing the history of the policy. """
         return {}
 
+    def _reserve(self, size):
+        """ Make sure the training buffer can hold the given number of examples.
+
+            The capacity is doubled whenever the buffer is full, so that adding
+            examples one at a time takes amortised constant time.
+        """
+        capacity = len(self._y_train)
+        if size <= capacity:
+            return
+
+        capacity = min(max(2 * capacity, 2 * size, 64), self.pool_size)
+        X_train = np.empty((capacity,) + self._X_train.shape[1:], dtype=self._X_train.dtype)
+        y_train = np.empty(capacity, dtype=self._y_train.dtype)
+        X_train[:self.n_labelled] = self._X_train[:self.n_labelled]
+        y_train[:self.n_labelled] = self._y_train[:self.n_labelled]
+        self._X_train, self._y_train = X_train, y_train
+
+    def _gather_candidates(self, candidate_mask):
+        """ Copy the features of the candidates into a buffer reused across iterations.
+
+            The returned array is only valid until the next call.
+        """
+        candidate_index = np.flatnonzero(candidate_mask)
+        n_candidates = len(candidate_index)
+
+        # the number of candidates never grows, so this allocates only once
+        if len(self._candidate_pool) < n_candidates:
+            self._candidate_pool = np.empty((n_candidates,) + self.pool.shape[1:],
+                                            dtype=self.pool.dtype)
+
+        # mode='clip' lets numpy write straight into the buffer (the indices are valid)
+        candidate_pool = self._candidate_pool[:n_candidates]
+        np.take(self.pool, candidate_index, axis=0, out=candidate_pool, mode='clip')
+        return candidate_pool
+
     def _sample(self):
         """ Take a random sample of candidates from the unlabelled pool. """
         candidate_mask = self.labels.mask
-        if 0 < self.n_candidates < np.sum(candidate_mask):
-            unlabelled_index = np.where(candidate_mask)[0]
-            candidate_index = self.seed.choice(unlabelled_index, self.n_candidates, replace=False)
+        n_unlabelled = np.count_nonzero(candidate_mask)
+        if 0 < self.n_candidates < n_unlabelled:
+            # sample positions rather than shuffling the whole unlabelled pool, which is
+            # much cheaper when we only need a small number of candidates
+            unlabelled_index = np.flatnonzero(candidate_mask)
+            candidate_index = unlabelled_index[sample_without_replacement(
+                n_unlabelled, self.n_candidates, random_state=self.seed)]
             candidate_mask = np.zeros(self.pool_size, dtype=bool)
             candidate_mask[candidate_index] = True
         return candidate_mask
@@ -152,11 +245,17 @@ class SingleSuggestion(Policy):
         n_best_candidates : int, optional (default=1)
             The number of candidates returned at each iteration for labelling. Batch-mode
             active learning is where this parameter is greater than 1.
+
+        classes : array, optional (default=None)
+            All the classes that the labels can take. If given and the classifier has
+            the partial_fit method, the classifier is updated incrementally, since the
+            classes then don't need to be inferred from the labelled examples alone.
+            Otherwise the classifier is retrained from scratch with the fit method.
     """
     def __init__(self, pool, labels, classifier, arm, random_state=None,
-                 n_candidates=None, n_best_candidates=1):
+                 n_candidates=None, n_best_candidates=1, classes=None):
         super().__init__(pool, labels, classifier, random_state,
-                         n_candidates, n_best_candidates)
+                         n_candidates, n_best_candidates, classes)
         self.arm = arm
 
     def select(self):
@@ -168,8 +267,10 @@ class SingleSuggestion(Policy):
                 An array of indices of objects in the pool.
         """
         candidate_mask = self._sample()
-        predictions = self.classifier.predict_proba(self.pool[candidate_mask])
-        best_candidates = self.arm.select(candidate_mask, predictions, self.n_best_candidates)
+        candidate_pool = self._gather_candidates(candidate_mask)
+        predictions = self.classifier.predict_proba(candidate_pool)
+        best_candidates = self.arm.select(candidate_mask, predictions, self.n_best_candidates,
+                                          candidate_pool)
         return best_candidates
 
 
@@ -209,11 +310,17 @@ class MultipleSuggestions(Policy):
         n_best_candidates : int, optional (default=1)
             The number of candidates returned at each iteration for labelling. Batch-mode
             active learning is where this parameter is greater than 1.
+
+        classes : array, optional (default=None)
+            All the classes that the labels can take. If given and the classifier has
+            the partial_fit method, the classifier is updated incrementally, since the
+            classes then don't need to be inferred from the labelled examples alone.
+            Otherwise the classifier is retrained from scratch with the fit method.
     """
     def __init__(self, pool, labels, classifier, arms, random_state=None,
-                 n_candidates=None, n_best_candidates=1):
+                 n_candidates=None, n_best_candidates=1, classes=None):
         super().__init__(pool, labels, classifier, random_state,
-                         n_candidates, n_best_candidates)
+                         n_candidates, n_best_candidates, classes)
         self.arms = arms
         self.n_arms = len(arms)
 
@@ -254,11 +361,17 @@ class ActiveBandit(MultipleSuggestions):
         n_best_candidates : int, optional (default=1)
             The number of candidates returned at each iteration for labelling. Batch-mode
             active learning is where this parameter is greater than 1.
+
+        classes : array, optional (default=None)
+            All the classes that the labels can take. If given and the classifier has
+            the partial_fit method, the classifier is updated incrementally, since the
+            classes then don't need to be inferred from the labelled examples alone.
+            Otherwise the classifier is retrained from scratch with the fit method.
     """
     def __init__(self, pool, labels, classifier, arms, random_state=None,
-                 n_candidates=None, n_best_candidates=1):
+                 n_candidates=None, n_best_candidates=1, classes=None):
         super().__init__(pool, labels, classifier, arms, random_state,
-                         n_candidates, n_best_candidates)
+                         n_candidates, n_best_candidates, classes)
         self.time_step = 0
         self.T = np.zeros(self.n_arms)
         self.reward_history = []
@@ -267,9 +380,10 @@ class ActiveBandit(MultipleSuggestions):
     def _select_from_arm(self):
         """ Use a particular arm to select candidates from the pool. """
         candidate_mask = self._sample()
-        predictions = self.classifier.predict_proba(self.pool[candidate_mask])
+        candidate_pool = self._gather_candidates(candidate_mask)
+        predictions = self.classifier.predict_proba(candidate_pool)
         best_candidates = self.arms[self.selected_arm].select(
-            candidate_mask, predictions, self.n_best_candidates)
+            candidate_mask, predictions, self.n_best_candidates, candidate_pool)
         return best_candidates
 
     def receive_reward(self, reward):
@@ -355,11 +469,18 @@ class ThompsonSampling(ActiveBandit):
 
         tau : float, optional (default=0.02)
             The initial estimate of the variance of the reward received from all arms.
+
+        classes : array, optional (default=None)
+            All the classes that the labels can take. If given and the classifier has
+            the partial_fit method, the classifier is updated incrementally, since the
+            classes then don't need to be inferred from the labelled examples alone.
+            Otherwise the classifier is retrained from scratch with the fit method.
     """
     def __init__(self, pool, labels, classifier, arms, random_state=None,
-                 n_candidates=None, n_best_candidates=1, mu=0.5, sigma=0.02, tau=0.02):
+                 n_candidates=None, n_best_candidates=1, mu=0.5, sigma=0.02, tau=0.02,
+                 classes=None):
         super().__init__(pool, labels, classifier, arms, random_state,
-                         n_candidates, n_best_candidates)
+                         n_candidates, n_best_candidates, classes)
         self.mu = np.full(self.n_arms, mu, dtype=np.float64)
         self.sigma = np.full(self.n_arms, sigma, dtype=np.float64)
         self.tau = np.full(self.n_arms, tau, dtype=np.float64)
@@ -472,12 +593,18 @@ class OCUCB(ActiveBandit):
         horizon : int
             The OC-UCB algorithm requires the knowledge of the horizon, i.e.
             the maximum number of time steps.
+
+        classes : array, optional (default=None)
+            All the classes that the labels can take. If given and the classifier has
+            the partial_fit method, the classifier is updated incrementally, since the
+            classes then don't need to be inferred from the labelled examples alone.
+            Otherwise the classifier is retrained from scratch with the fit method.
     """
     def __init__(self, pool, labels, classifier, arms, random_state=None,
                  n_candidates=None, n_best_candidates=1, alpha=3, psi=2,
-                 horizon=1000):
+                 horizon=1000, classes=None):
         super().__init__(pool, labels, classifier, arms, random_state,
-                         n_candidates, n_best_candidates)
+                         n_candidates, n_best_candidates, classes)
         self.alpha = 3
         self.psi = 2
         self.mu = np.zeros(self.n_arms)
@@ -539,11 +666,17 @@ class EXP3PP(ActiveBandit):
         n_best_candidates : int, optional (default=1)
             The number of candidates returned at each iteration for labelling. Batch-mode
             active learning is where this parameter is greater than 1.
+
+        classes : array, optional (default=None)
+            All the classes that the labels can take. If given and the classifier has
+            the partial_fit method, the classifier is updated incrementally, since the
+            classes then don't need to be inferred from the labelled examples alone.
+            Otherwise the classifier is retrained from scratch with the fit method.
     """
     def __init__(self, pool, labels, classifier, arms, random_state=None,
-                 n_candidates=None, n_best_candidates=1):
+                 n_candidates=None, n_best_candidates=1, classes=None):
         super().__init__(pool, labels, classifier, arms, random_state,
-                         n_candidates, n_best_candidates)
+                         n_candidates, n_best_candidates, classes)
         self.loss = np.zeros(self.n_arms)
         self.loss_history = [self.loss]
 
@@ -649,11 +782,17 @@ class KLUCB(ActiveBandit):
 
         sigma : float, optional (default=0.02)
             The initial estimate of the variance of the distribution of reward from all arms.
+
+        classes : array, optional (default=None)
+            All the classes that the labels can take. If given and the classifier has
+            the partial_fit method, the classifier is updated incrementally, since the
+            classes then don't need to be inferred from the labelled examples alone.
+            Otherwise the classifier is retrained from scratch with the fit method.
     """
     def __init__(self, pool, labels, classifier, arms, random_state=None,
-                 n_candidates=None, n_best_candidates=1, mu=0, sigma=0.02):
+                 n_candidates=None, n_best_candidates=1, mu=0, sigma=0.02, classes=None):
         super().__init__(pool, labels, classifier, arms, random_state,
-                         n_candidates, n_best_candidates)
+                         n_candidates, n_best_candidates, classes)
         self.mu = np.full(self.n_arms, mu, dtype=np.float64)
         self.sum_mu = np.full(self.n_arms, mu, dtype=np.float64)
         self.sigma = sigma
@@ -723,11 +862,17 @@ class ActiveAggregator(MultipleSuggestions):
         n_best_candidates : int, optional (default=1)
             The number of candidates returned at each iteration for labelling. Batch-mode
             active learning is where this parameter is greater than 1.
+
+        classes : array, optional (default=None)
+            All the classes that the labels can take. If given and the classifier has
+            the partial_fit method, the classifier is updated incrementally, since the
+            classes then don't need to be inferred from the labelled examples alone.
+            Otherwise the classifier is retrained from scratch with the fit method.
     """
     def __init__(self, pool, labels, classifier, arms, aggregator='borda',
-                 random_state=None, n_candidates=None, n_best_candidates=1):
+                 random_state=None, n_candidates=None, n_best_candidates=1, classes=None):
         super().__init__(pool, labels, classifier, arms, random_state,
-                         n_candidates, n_best_candidates)
+                         n_candidates, n_best_candidates, classes)
         self.aggregator = aggregator
 
         if aggregator == 'borda':
@@ -750,37 +895,55 @@ class ActiveAggregator(MultipleSuggestions):
                 An array of indices of objects in the pool.
         """
         candidate_mask = self._sample()
-        predictions = self.classifier.predict_proba(self.pool[candidate_mask])
-
-        voters = [arm.select(candidate_mask, predictions, self.n_candidates) for arm in self.arms]
+        candidate_pool = self._gather_candidates(candidate_mask)
+        predictions = self.classifier.predict_proba(candidate_pool)
+
+        # arms that share a committee only need it to be trained once per round
+        committee_predictions = {}
+        voters = []
+        for arm in self.arms:
+            if isinstance(arm, CommitteeArm):
+                key = (id(arm.committee), arm.n_committee_samples)
+                if key not in committee_predictions:
+                    committee_predictions[key] = arm.fit_and_predict(candidate_mask,
+                                                                     candidate_pool)
+                voters.append(arm.select(candidate_mask, predictions, self.n_candidates,
+                                         candidate_pool, committee_predictions[key]))
+            else:
+                voters.append(arm.select(candidate_mask, predictions, self.n_candidates,
+                                         candidate_pool))
         voters = np.array(voters)
         best_candidates = self._aggregate_votes(voters)
         return best_candidates
 
     def _aggregate_votes_borda(self, voters):
         """ Aggregate the ranks from the arms using Borda count. """
-        max_score = len(voters[0])
-        points = {}
+        max_score = voters.shape[1]
 
         # accumulate the points for each candidate
-        for voter in voters:
-            for idx, candidate in enumerate(voter):
-                points[candidate] = points.get(candidate, 0) + max_score - idx
+        scores = np.tile(max_score - np.arange(max_score), len(voters))
+        points = np.bincount(voters.ravel(), weights=scores, minlength=self.pool_size)
 
         # sort the candidates and return the most popular one(s)
-        rank = sorted(points, key=points.__getitem__, reverse=True)
-        return rank[:self.n_best_candidates]
+        return self._rank_candidates(voters, points)
 
     def _aggregate_votes_geometric(self, voters):
         """ Aggregate the ranks from the arms using the geometric mean. """
-        max_score = len(voters[0])
-        points = {}
+        max_score = voters.shape[1]
 
-        # accumulate the points for each candidate
-        for voter in voters:
-            for idx, candidate in enumerate(voter):
-                points[candidate] = points.get(candidate, 1) * (max_score - idx)
+        # accumulate the points for each candidate, in log space to avoid overflow
+        scores = np.tile(np.log(max_score - np.arange(max_score)), len(voters))
+        points = np.bincount(voters.ravel(), weights=scores, minlength=self.pool_size)
+
+        # equal products can differ in the last bits once summed in log space,
+        # so round them to keep ties broken by the pool index
+        points = np.round(points, 9)
 
         # sort the candidates and return the most popular one(s)
-        rank = sorted(points, key=points.__getitem__, reverse=True)
+        return self._rank_candidates(voters, points)
+
+    def _rank_candidates(self, voters, points):
+        """ Sort the candidates that received votes from the most to the least points. """
+        candidates = np.unique(voters)
+        rank = candidates[np.argsort(-points[candidates], kind='mergesort')]
         return rank[:self.n_best_candidates]
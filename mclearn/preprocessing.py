@@ -21,9 +21,16 @@ def normalise_z(features):
         features_normalised : array, shape = [n_samples, n_features]
     """
        
-    mu = np.mean(features, axis=0)
-    sigma = np.std(features, axis=0)
-    return (features - mu) / sigma
+    values = np.asarray(features)
+    mu = np.mean(values, axis=0)
+
+    # centre the features once and reuse the centred copy to compute the
+    # standard deviation and to hold the output, avoiding extra temporaries
+    features_normalised = np.subtract(values, mu)
+    sigma = np.sqrt(np.einsum('i...,i...->...', features_normalised, features_normalised) /
+                    len(features_normalised))
+    np.divide(features_normalised, sigma, out=features_normalised)
+    return _like_input(features, features_normalised)
     
 
 def normalise_unit_var(features):
@@ -56,9 +63,24 @@ def normalise_01(features):
         features_normalised : array, shape = [n_samples, n_features]
     """
     
-    minimum = np.min(features, axis=0)
-    maximum = np.max(features, axis=0)
-    return (features - minimum) / (maximum - minimum)
+    values = np.asarray(features)
+    minimum = np.min(values, axis=0)
+    maximum = np.max(values, axis=0)
+
+    # integer features need a floating point output array
+    features_normalised = np.subtract(values, minimum, dtype=np.result_type(values, 1.0))
+    np.divide(features_normalised, maximum - minimum, out=features_normalised)
+    return _like_input(features, features_normalised)
+
+
+def _like_input(features, values):
+    """ Wrap the values in the same pandas container as the input features, if any. """
+
+    if isinstance(features, pd.DataFrame):
+        return pd.DataFrame(values, index=features.index, columns=features.columns)
+    if isinstance(features, pd.Series):
+        return pd.Series(values, index=features.index, name=features.name)
+    return values
 
 
 def _get_train_test_size(train_size, test_size, n_samples):
@@ -157,24 +179,29 @@ def balanced_train_test_split(X, y, test_size=None, train_size=None, bootstrap=F
                          'or enable bootstraping.'.format(min_count))
     
     # selected indices are stored here
-    train = []
-    test = []
+    train = np.empty(n_classes * n_train, dtype=np.intp)
+    test = np.empty(n_classes * n_test, dtype=np.intp)
+
+    # group the indices by class with a single stable sort, so that the examples of
+    # class i occupy positions cls_start[i] to cls_start[i + 1] in cls_index
+    cls_index = np.argsort(y_indices, kind='mergesort')
+    cls_start = np.concatenate(([0], np.cumsum(cls_count)))
     
     # get the desired sample from each class
-    for i, cls in enumerate(classes):
+    for i in range(n_classes):
         if bootstrap:
             shuffled = rng.choice(cls_count[i], n_total, replace=True)
         else:
             shuffled = rng.permutation(cls_count[i])
         
-        cls_i = np.where(y == cls)[0][shuffled]
-        train.extend(cls_i[:n_train])
-        test.extend(cls_i[n_train:n_total])
+        cls_i = cls_index[cls_start[i]:cls_start[i + 1]][shuffled]
+        train[i * n_train:(i + 1) * n_train] = cls_i[:n_train]
+        test[i * n_test:(i + 1) * n_test] = cls_i[n_train:n_total]
         
-    train = list(rng.permutation(train))
-    test = list(rng.permutation(test))
+    train = rng.permutation(train)
+    test = rng.permutation(test)
     
-    return X[train], X[test], y[train], y[test]
+    return X.take(train, axis=0), X.take(test, axis=0), y.take(train), y.take(test)
 
 
 def csv_to_hdf(csv_path, no_files=1, hdf_path='store.h5', data_cols=None, expectedrows=7569900,
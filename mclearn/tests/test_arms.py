@@ -0,0 +1,34 @@
+import numpy as np
+from .datasets import Dataset
+from mclearn.arms import RandomArm
+
+
+class TestSelectRandomly:
+    @classmethod
+    def setup_class(cls):
+        cls.data = Dataset('glass')
+        cls.pool = np.array(cls.data.features)
+        cls.labels = np.ma.MaskedArray(np.array(cls.data.target), mask=True)
+        cls.candidate_mask = np.zeros(len(cls.pool), dtype=bool)
+        cls.candidate_mask[[4, 8, 15, 16, 23, 42, 100, 150]] = True
+
+    def test_all_candidates(self):
+        arm = RandomArm(self.pool, self.labels, random_state=0)
+        for n_best_candidates in [8, 20]:
+            best = arm._select_randomly(self.candidate_mask, n_best_candidates)
+            assert sorted(best) == [4, 8, 15, 16, 23, 42, 100, 150]
+
+    def test_some_candidates(self):
+        arm = RandomArm(self.pool, self.labels, random_state=0)
+        for _ in range(20):
+            best = arm._select_randomly(self.candidate_mask, 3)
+            assert len(best) == 3
+            assert len(np.unique(best)) == 3
+            assert np.all(self.candidate_mask[best])
+
+    def test_random_arm(self):
+        best = RandomArm(self.pool, self.labels, random_state=0).select(
+            self.candidate_mask, None, 5)
+        assert np.array_equal(best, RandomArm(self.pool, self.labels, random_state=0).select(
+            self.candidate_mask, None, 5))
+        assert np.all(self.candidate_mask[best])
@@ -0,0 +1,43 @@
+import numpy as np
+from numpy.random import RandomState
+from sklearn import metrics
+from mclearn.performance import (classification_scores,
+                                 mpba_score,
+                                 micro_f1_score)
+
+
+class TestClassificationScores:
+    @classmethod
+    def setup_class(cls):
+        seed = RandomState(1234)
+        cls.y_binary = seed.randint(0, 2, 200)
+        cls.y_multiclass = seed.randint(0, 4, 200)
+
+    def noisy(self, y_true, n_classes):
+        # predictions that are right about two thirds of the time
+        seed = RandomState(0)
+        y_pred = y_true.copy()
+        wrong = seed.rand(len(y_true)) < 0.33
+        y_pred[wrong] = seed.randint(0, n_classes, np.sum(wrong))
+        return y_pred
+
+    def check_scores(self, y_true, y_pred, n_classes):
+        mpba, accuracy, f1 = classification_scores(y_true, y_pred, n_classes)
+        assert np.isclose(mpba, mpba_score(y_true, y_pred))
+        assert np.isclose(accuracy, metrics.accuracy_score(y_true, y_pred))
+        assert np.isclose(f1, micro_f1_score(y_true, y_pred, n_classes))
+
+    def test_binary(self):
+        y_pred = self.noisy(self.y_binary, 2)
+        self.check_scores(self.y_binary, y_pred, 2)
+        self.check_scores(self.y_binary, y_pred, None)
+
+    def test_multiclass(self):
+        y_pred = self.noisy(self.y_multiclass, 4)
+        self.check_scores(self.y_multiclass, y_pred, 4)
+        self.check_scores(self.y_multiclass, y_pred, None)
+
+    def test_missing_class(self):
+        # a class that is never predicted still has a row in the confusion matrix
+        y_pred = np.where(self.y_multiclass == 3, 0, self.y_multiclass)
+        self.check_scores(self.y_multiclass, y_pred, 4)
@@ -0,0 +1,86 @@
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import MultinomialNB
+from .datasets import Dataset
+from mclearn.arms import RandomArm
+from mclearn.policies import SingleSuggestion, ActiveAggregator
+
+
+class TestPolicyBuffer:
+    @classmethod
+    def setup_class(cls):
+        cls.data = Dataset('wine')
+        cls.pool = np.array(cls.data.features)
+        cls.oracle = np.array(cls.data.target)
+
+    def make_policy(self, labelled_index=(), classifier=None, classes=None):
+        labels = np.ma.MaskedArray(self.oracle, mask=True)
+        labels[list(labelled_index)] = self.oracle[list(labelled_index)]
+        classifier = classifier if classifier is not None else LogisticRegression()
+        return SingleSuggestion(self.pool, labels, classifier,
+                                RandomArm(self.pool, labels, random_state=0),
+                                random_state=0, classes=classes)
+
+    def test_pre_labelled(self):
+        policy = self.make_policy([3, 70, 150])
+        assert policy.n_labelled == 3
+        assert np.array_equal(policy._X_train[:3], self.pool[[3, 70, 150]])
+        assert np.array_equal(policy._y_train[:3], self.oracle[[3, 70, 150]])
+
+    def test_add(self):
+        policy = self.make_policy([3, 70, 150])
+        policy.add(10, self.oracle[10])
+        policy.add([20, 100], self.oracle[[20, 100]])
+        assert policy.n_labelled == 6
+        assert np.array_equal(policy._X_train[:6], self.pool[[3, 70, 150, 10, 20, 100]])
+        assert np.array_equal(policy._y_train[:6], self.oracle[[3, 70, 150, 10, 20, 100]])
+        assert policy.labels.count() == 6
+
+    def test_add_labelled_again(self):
+        policy = self.make_policy([3, 70, 150])
+        policy.add([70, 10, 10], self.oracle[[70, 10, 10]])
+        policy.add(3, self.oracle[3])
+        assert policy.n_labelled == 4
+        assert np.array_equal(policy._X_train[:4], self.pool[[3, 70, 150, 10]])
+        assert np.array_equal(policy._y_train[:4], self.oracle[[3, 70, 150, 10]])
+
+    def test_partial_fit(self):
+        classes = np.unique(self.oracle)
+        policy = self.make_policy([3, 70], MultinomialNB(), classes)
+        policy.add(150, self.oracle[150])
+        policy.add([10, 100], self.oracle[[10, 100]])
+
+        classifier = MultinomialNB().fit(self.pool[[3, 70, 150, 10, 100]],
+                                         self.oracle[[3, 70, 150, 10, 100]])
+        assert np.array_equal(policy.classifier.classes_, classes)
+        assert np.allclose(policy.classifier.feature_count_, classifier.feature_count_)
+        assert np.array_equal(policy.classifier.predict(self.pool), classifier.predict(self.pool))
+
+
+class TestAggregator:
+    @classmethod
+    def setup_class(cls):
+        cls.data = Dataset('glass')
+        cls.pool = np.array(cls.data.features)
+        cls.labels = np.ma.MaskedArray(np.array(cls.data.target), mask=True)
+        # each row is the ranking of the candidates by one arm
+        cls.voters = np.array([[2, 9, 5, 7],
+                               [9, 5, 2, 1],
+                               [5, 2, 9, 3]])
+
+    def make_policy(self, aggregator, n_best_candidates):
+        arms = [RandomArm(self.pool, self.labels, random_state=0)]
+        return ActiveAggregator(self.pool, self.labels, LogisticRegression(), arms,
+                                aggregator, random_state=0,
+                                n_best_candidates=n_best_candidates)
+
+    def test_borda(self):
+        # 5, 2 and 9 all get 9 points and the ties are broken by the pool index,
+        # followed by 1, 3 and 7 with 1 point each
+        policy = self.make_policy('borda', 6)
+        assert list(policy._aggregate_votes(self.voters)) == [2, 5, 9, 1, 3, 7]
+
+    def test_geometric(self):
+        # 5, 2 and 9 all get 24 points, while 1, 3 and 7 get 1 point
+        policy = self.make_policy('geometric', 4)
+        assert list(policy._aggregate_votes(self.voters)) == [2, 5, 9, 1]